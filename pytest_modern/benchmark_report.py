@@ -14,6 +14,8 @@ from rich.text import Text
 
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+
     import pytest
 
     from pytest_benchmark.session import BenchmarkSession
@@ -22,15 +24,46 @@ if TYPE_CHECKING:
     from rich.console import RenderResult
 
 
+TIME_PROPS = ("min", "max", "mean", "median", "iqr", "stddev")
+# column order and headers, the unit dependent ones are filled in per group
+LABELS = {
+    "name": "Name",
+    "min": "Min",
+    "max": "Max",
+    "mean": "Mean",
+    "stddev": "StdDev",
+    "rounds": "Rounds",
+    "iterations": "Iterations",
+    "iqr": "IQR",
+    "median": "Median",
+    "outliers": "Outliers",
+    "ops": "OPS",
+}
+
+STYLE_HEADER = rich.style.Style(bold=True, dim=True)
+STYLE_NAME = rich.style.Style(color="blue")
+STYLE_GROUP = rich.style.Style(color="yellow")
+STYLE_BEST = rich.style.Style(color="green", bold=True)
+STYLE_WORST = rich.style.Style(color="red", bold=True)
+STYLE_VALUE = rich.style.Style(bold=True)
+
+
 @dataclass
 class BenchmarkReport:
+    __slots__ = ("config", "session")
+
     session: BenchmarkSession
     config: pytest.Config
 
+    @property
+    def is_empty(self) -> bool:
+        return not self.session.groups
+
     def __rich_console__(
         self, console: Console, options: ConsoleOptions
     ) -> RenderResult:
-        if not self.session.groups:
+        # callers check is_empty first, the guard keeps a direct render safe too
+        if self.is_empty:
             return
 
         yield "──────────"
@@ -39,26 +72,25 @@ class BenchmarkReport:
         scale_unit = partial(
             self.config.hook.pytest_benchmark_scale_unit, config=self.config
         )
-        compares: dict[str, tuple[str, list[tuple[str, float]]]] = {}
+        summary_rows: list[tuple[str, str, str]] = []
+        sort_key = operator.itemgetter(self.session.sort)
 
-        for group_name, benchmarks in self.session.groups or []:
+        for group_name, benchmarks in self.session.groups:
             group_name: str
-            benchmarks = sorted(benchmarks, key=operator.itemgetter(self.session.sort))
+            # each group is a fresh list built by pytest_benchmark_group_stats
+            benchmarks.sort(key=sort_key)
             for bench in benchmarks:
                 bench["name"] = self.session.name_format(bench)
 
-            worst = {}
-            best = {}
-            for prop in ("min", "max", "mean", "median", "iqr", "stddev", "ops"):
-                if prop == "ops":
-                    worst[prop] = min(bench[prop] for bench in benchmarks)
-                    best[prop] = max(bench[prop] for bench in benchmarks)
-                else:
-                    worst[prop] = max(bench[prop] for bench in benchmarks)
-                    best[prop] = min(bench[prop] for bench in benchmarks)
-
-            for prop in ("outliers", "rounds", "iterations"):
-                worst[prop] = max(benchmark[prop] for benchmark in benchmarks)
+            columns = {
+                prop: list(map(operator.itemgetter(prop), benchmarks))
+                for prop in (*TIME_PROPS, "ops")
+            }
+            worst = {prop: max(columns[prop]) for prop in TIME_PROPS}
+            best = {prop: min(columns[prop]) for prop in TIME_PROPS}
+            worst["ops"] = min(columns["ops"])
+            best["ops"] = max(columns["ops"])
+            fatest_idx = columns["mean"].index(best["mean"])
 
             unit, adjustment = scale_unit(
                 unit="seconds",
@@ -75,16 +107,11 @@ class BenchmarkReport:
                 sort=self.session.sort,
             )
             labels = {
-                "name": "Name",
+                **LABELS,
                 "min": f"Min ({unit}s)",
                 "max": f"Max ({unit}s)",
                 "mean": f"Mean ({unit}s)",
                 "stddev": f"StdDev ({unit}s)",
-                "rounds": "Rounds",
-                "iterations": "Iterations",
-                "iqr": "IQR",
-                "median": "Median",
-                "outliers": "Outliers",
                 "ops": f"OPS ({ops_unit}ops/s)" if ops_unit else "OPS",
             }
 
@@ -97,87 +124,88 @@ class BenchmarkReport:
             )
             for label_header in labels.values():
                 table.add_column(
-                    Text(label_header, style=rich.style.Style(bold=True, dim=True)),
+                    Text(label_header, style=STYLE_HEADER),
                     overflow="fold",
                 )
 
-            for benchmark in benchmarks:
-                ceils: list[Text] = []
-                for prop in labels:
-                    benchmark_value = benchmark[prop]
-                    if prop in ("min", "max", "mean", "stddev", "median", "iqr"):
-                        color = None
-                        if benchmark_value == best[prop]:
-                            color = "green"
-                        elif benchmark_value == worst[prop]:
-                            color = "red"
-                        ceils.append(
-                            Text(
-                                f"{benchmark_value * adjustment:.4f}",
-                                style=rich.style.Style(color=color, bold=True),
-                            )
+            formatters: list[Callable[[dict], Text | str]] = []
+            for prop in labels:
+                if prop == "name":
+                    formatters.append(partial(format_name, prop))
+                elif prop in TIME_PROPS:
+                    formatters.append(
+                        partial(
+                            format_scaled, prop, adjustment, best[prop], worst[prop]
                         )
-                    elif prop == "ops":
-                        color = None
-                        if benchmark_value == best[prop]:
-                            color = "green"
-                        elif benchmark_value == worst[prop]:
-                            color = "red"
-                        ceils.append(
-                            Text(
-                                f"{benchmark_value * ops_adjustment:.4f}",
-                                style=rich.style.Style(color=color, bold=True),
-                            )
+                    )
+                elif prop == "ops":
+                    formatters.append(
+                        partial(
+                            format_scaled, prop, ops_adjustment, best[prop], worst[prop]
                         )
-                    elif prop == "name":
-                        ceils.append(
-                            Text(
-                                benchmark_value,
-                                style=rich.style.Style(color="blue"),
-                            )
-                        )
-                    else:
-                        ceils.append(Text(str(benchmark_value)))
-                table.add_row(*ceils)
+                    )
+                else:
+                    formatters.append(partial(format_plain, prop))
+
+            for benchmark in benchmarks:
+                table.add_row(*(formatter(benchmark) for formatter in formatters))
             yield table
 
             if group_name:
-                fatest_idx = 0
-                for idx, benchmark in enumerate(benchmarks):
-                    if benchmark["mean"] < benchmarks[fatest_idx]["mean"]:
-                        fatest_idx = idx
-                fatest_name: str = benchmarks[fatest_idx]["name"]
-                fatest_mean: float = benchmarks[fatest_idx]["mean"]
-                compares[group_name] = (
-                    fatest_name,
-                    [
-                        (
-                            benchmark["name"],
-                            benchmark["mean"] / fatest_mean,
-                        )
-                        for benchmark in benchmarks
-                        if benchmark["name"] != fatest_name
-                    ],
+                fatest_mean: float = best["mean"]
+                summary_rows.append(
+                    (
+                        group_name,
+                        f"[blue]{benchmarks[fatest_idx]['name']}[/]",
+                        "[green]1[/]x",
+                    )
+                )
+                summary_rows.extend(
+                    (
+                        "",
+                        f"[blue]{benchmark['name']}[/]",
+                        f"[red]{benchmark['mean'] / fatest_mean:.2f}[/]x",
+                    )
+                    for idx, benchmark in enumerate(benchmarks)
+                    if idx != fatest_idx
                 )
 
-        if compares:
+        if summary_rows:
             yield Text.from_markup("[magenta bold] Benchmark Summary (by mean)[/]")
             table = Table(
                 box=rich.box.SIMPLE,
                 padding=(0, 2),
             )
             table.add_column(
-                Text("Group", style=rich.style.Style(bold=True, dim=True)),
-                style=rich.style.Style(color="yellow"),
+                Text("Group", style=STYLE_HEADER),
+                style=STYLE_GROUP,
             )
-            table.add_column(Text("Name", style=rich.style.Style(bold=True, dim=True)))
+            table.add_column(Text("Name", style=STYLE_HEADER))
             table.add_column(
-                Text("Ratio", style=rich.style.Style(bold=True, dim=True)),
+                Text("Ratio", style=STYLE_HEADER),
                 justify="right",
             )
 
-            for group_name, (base_name, ratios) in compares.items():
-                table.add_row(group_name, f"[blue]{base_name}[/]", "[green]1[/]x")
-                for other_name, ratio in ratios:
-                    table.add_row("", f"[blue]{other_name}[/]", f"[red]{ratio:.2f}[/]x")
+            for row in summary_rows:
+                table.add_row(*row)
             yield table
+
+
+def format_name(prop: str, benchmark: dict) -> Text:
+    return Text(benchmark[prop], style=STYLE_NAME)
+
+
+def format_plain(prop: str, benchmark: dict) -> str:
+    return str(benchmark[prop])
+
+
+def format_scaled(
+    prop: str, adjustment: float, best: float, worst: float, benchmark: dict
+) -> Text:
+    value = benchmark[prop]
+    style = STYLE_VALUE
+    if value == best:
+        style = STYLE_BEST
+    elif value == worst:
+        style = STYLE_WORST
+    return Text(f"{value * adjustment:.4f}", style=style)
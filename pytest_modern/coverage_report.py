@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import re
+
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
@@ -23,8 +25,17 @@ if TYPE_CHECKING:
     from rich.console import RenderResult
 
 
+STYLE_HEADER = rich.style.Style(bold=True, dim=True)
+STYLE_FILE = rich.style.Style(color="yellow")
+STYLE_MISS = rich.style.Style(color="red")
+
+COVERAGE_LINE_RE = re.compile(r"^(\S+)\s+(\S+)\s+(\S+)\s+(\S+)(?:\s+(.*))?$")
+
+
 @dataclass
 class FileReport:
+    __slots__ = ("cover", "miss", "missing", "name", "stmts")
+
     name: str
     stmts: str
     miss: str
@@ -34,23 +45,28 @@ class FileReport:
 
 @dataclass
 class CoverageReport:
+    __slots__ = ("config", "plugin")
+
     config: pytest.Config
     plugin: CovPlugin
 
-    def __rich_console__(
-        self, console: Console, options: ConsoleOptions
-    ) -> RenderResult:
-        if (
+    @property
+    def is_empty(self) -> bool:
+        return (
             self.plugin._disabled
             or self.plugin.cov_controller is None
             or self.plugin.cov_total is None
-        ):
-            return
+            or not self.plugin.cov_report.getvalue()
+        )
 
-        report = self.plugin.cov_report.getvalue()
-        if not report:
+    def __rich_console__(
+        self, console: Console, options: ConsoleOptions
+    ) -> RenderResult:
+        # callers check is_empty first, the guard keeps a direct render safe too
+        if self.is_empty:
             return
 
+        report = self.plugin.cov_report.getvalue()
         yield "──────────"
         yield Text.from_markup("[bold dark_green]  Coverage[/]")
         table = Table(
@@ -59,24 +75,23 @@ class CoverageReport:
             show_footer=True,
         )
 
+        # yield_report stops right after the TOTAL line, so it is always the last one
         reports = list(self.yield_report(report))
-        [total] = [item for item in reports if item.name == "TOTAL"]
-        reports = [item for item in reports if item.name != "TOTAL"]
+        total = reports.pop()
+        show_missing = "term-missing" in self.config.getoption("cov_report")
         columns = ["name", "stmts", "miss", "cover"] + (
-            ["missing"] if "term-missing" in self.config.getoption("cov_report") else []
+            ["missing"] if show_missing else []
         )
         for column in columns:
             foot_col_value = getattr(total, column)
             if column == "missing":
                 foot_col_value = ""
             table.add_column(
-                header=Text(
-                    column.title(), style=rich.style.Style(bold=True, dim=True)
-                ),
+                header=Text(column.title(), style=STYLE_HEADER),
                 footer=Text(
-                    foot_col_value,
-                    style=rich.style.Style(color="red" if column == "miss" else None),
+                    foot_col_value, style=STYLE_MISS if column == "miss" else ""
                 ),
+                style=STYLE_MISS if column == "miss" else None,
                 overflow="fold",
                 justify="right" if column != "name" else "left",
             )
@@ -84,28 +99,36 @@ class CoverageReport:
         path_highlighter = PathHighlighter()
         for file_report in reports:
             table.add_row(
-                path_highlighter(
-                    Text(file_report.name, style=rich.style.Style(color="yellow"))
-                ),
+                path_highlighter(Text(file_report.name, style=STYLE_FILE)),
                 file_report.stmts,
-                Text(file_report.miss, style=rich.style.Style(color="red")),
+                file_report.miss,
                 file_report.cover,
-                *([] if "missing" not in columns else [", ".join(file_report.missing)]),
+                *([", ".join(file_report.missing)] if show_missing else []),
             )
 
         yield table
 
     def yield_report(self, report: str) -> Generator[FileReport, None, None]:
-        start = False
-        for line in report.splitlines():
-            if line.startswith("Name "):
-                start = True
+        lines = report.splitlines()
+        header = next(
+            (idx for idx, line in enumerate(lines) if line.startswith("Name ")), None
+        )
+        if header is None:
+            return
+
+        for line in lines[header + 1 :]:
+            if line[:1] == "-":
                 continue
-            if not start or line.startswith("---"):
+            match = COVERAGE_LINE_RE.match(line)
+            if match is None:
                 continue
-            file, stmts, miss, cover, *location = line.split()
+            file, stmts, miss, cover, location = match.groups()
             yield FileReport(
-                file, stmts, miss, cover, [item.strip(",") for item in location]
+                file,
+                stmts,
+                miss,
+                cover,
+                location.replace(",", "").split() if location else [],
             )
             if file == "TOTAL":
                 return
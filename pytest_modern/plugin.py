@@ -17,6 +17,13 @@ def pytest_addoption(parser: Parser):
         default=False,
         help="Disable pytest-modern",
     )
+    group.addoption(
+        "--modern-progress-file",
+        action="store",
+        default=None,
+        metavar="path",
+        help="Append a JSON line with the status and duration of every finished test to this file",
+    )
     with suppress(ImportError):
         import pytest_rerunfailures as _  # noqa: F401
 
@@ -28,7 +35,7 @@ def pytest_addoption(parser: Parser):
 def pytest_configure(config: Config) -> None:
     if (
         not config.getoption("modern_disable")
-        and not getattr(config, "slaveinput", None)
+        and not getattr(config, "workerinput", None)
         and not config.getoption("help")
     ):
         with suppress(ImportError):
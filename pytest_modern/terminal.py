@@ -1,22 +1,26 @@
 from __future__ import annotations
 
+import io
+import json
 import os
+import re
 import sys
 import threading
+import time
 
+from bisect import bisect_right
 from collections import defaultdict
 from contextlib import suppress
 from dataclasses import dataclass
+from functools import cache
+from functools import lru_cache
 from typing import TYPE_CHECKING
 
 import pytest
 import rich.console
 import rich.live
 import rich.padding
-import rich.panel
-import rich.rule
 import rich.style
-import rich.syntax
 import rich.text
 
 from _pytest import terminal
@@ -27,10 +31,6 @@ from _pytest.reports import BaseReport
 from _pytest.reports import CollectReport
 from rich.highlighter import ReprHighlighter
 
-from .header import generate_header_group
-from .traceback import ModernExceptionChainRepr
-from .traceback import ModernExceptionInfoRepr
-
 
 if TYPE_CHECKING:
     import warnings
@@ -44,32 +44,41 @@ if TYPE_CHECKING:
     from _pytest._code.code import ExceptionRepr
     from typing_extensions import TypedDict
 
-    Status = Literal[
-        "collected",
-        "running",
-        "passed",
-        "failed",
-        "skipped",
-        "xfailed",
-        "xpassed",
-        "warning",
-        "timeout",
-    ]
     CollectCategory = Literal["selected", "deselected", "error", "skipped"]
     NodeId = str
 
     class CategorizedReports(TypedDict):
-        running: list[pytest.TestReport]
         failed: list[pytest.TestReport]
         timeout: list[pytest.TestReport]
-        passed: list[pytest.TestReport]
-        xfailed: list[pytest.TestReport]
-        skipped: list[pytest.TestReport]
         warning: list[WarningReport]
 
 
+COLOR_FOR_TYPE = {
+    **terminal._color_for_type,
+    "deselected": "bright_black",
+    "timeout": "red",
+}
+SKIPPED_STATUSES = frozenset(("xfailed", "skipped"))
+FAILED_STATUSES = frozenset(("failed", "timeout"))
+# status -> (label, color) of its status line
+STATUS_DISPLAY = {
+    "running": ("RUNNING", "green"),
+    "failed": ("FAIL", "red"),
+    "passed": ("PASS", "green"),
+    "xfailed": ("XFAIL", "yellow"),
+    "xpassed": ("XPASS", "yellow"),
+    "skipped": ("SKIP", "yellow"),
+    "timeout": ("TIMEOUT", "red"),
+    "rerun": ("RETRY", "magenta"),
+}
+# whitespace right before a line ending or the end of the buffer
+TRAILING_SPACE_RE = re.compile(r"[^\S\r\n]+(?=[\r\n]|\Z)")
+
+
 @dataclass
 class WarningReport:
+    __slots__ = ("fslocation", "message", "nodeid")
+
     message: warnings.WarningMessage
     fslocation: tuple[str, int]
     nodeid: str
@@ -82,6 +91,11 @@ class ModernTerminalReporter:
         console: rich.console.Console | None = None,
     ):
         self.config = config
+        self.no_header: bool = config.getoption("no_header")  # type: ignore
+        self.no_summary: bool = config.getoption("no_summary")  # type: ignore
+        self.no_color: bool = config.getoption("color") == "no"
+        self.no_syntax: bool = config.getoption("code_highlight") == "no"  # type: ignore
+        self.disable_warnings: bool = config.getoption("disable_warnings")  # type: ignore
         self.console = console or rich.console.Console(
             highlight=False,
             force_terminal=True,
@@ -94,58 +108,112 @@ class ModernTerminalReporter:
         self.total_items_completed = 0
         self.collect_stats: dict[CollectCategory, list[pytest.Item]] = defaultdict(list)
         self.collect_errors: dict[NodeId, rich.console.RenderableType] = {}
-        self.items_per_file: dict[Path, list[pytest.Item]] = {}
-        self.status_per_item: dict[NodeId, Status] = {}
+        # ids of deselected, skipped and errored items, kept as they are reported
+        self.unselected: set[int] = set()
+        self.items_per_file: defaultdict[Path, list[pytest.Item]] = defaultdict(list)
         self.items: dict[NodeId, pytest.Item] = {}
         self.test_reports: dict[NodeId, pytest.TestReport] = {}
-        self.categorized_reports: CategorizedReports = defaultdict(list)  # type: ignore
+        # only the reports listed in the summary are kept, the rest are just counted
+        self.categorized_reports: CategorizedReports = {
+            "failed": [],
+            "timeout": [],
+            "warning": [],
+        }
+        self.stat_counts: dict[str, int] = defaultdict(int)
         self.total_duration: float = 0
+        self.last_collect_refresh: float = 0
+        # a single live display is reused for every test, it only ever shows the
+        # status of the running test, finished statuses are printed above it
+        self.test_live = new_live(console=self.console, transient=True)
+        self.test_status: rich.text.Text | None = None
+        # finished tests are appended as JSON lines, every record is a single
+        # O_APPEND write so readers never see a partial line
+        self.progress_fd: int | None = None
+
+        # the traceback code cache is only bound once a traceback is rendered
+        self.code_cache_bound = False
 
         # _tw is used by pytest.Config.get_terminal_writer
         # We need to set it to a terminal writer that does nothing
-        devnull_path = "nul" if os.name == "nt" else "/dev/null"
-        self._tw = TerminalWriter(file=open(devnull_path, "w"))  # noqa: SIM115
+        self._tw = TerminalWriter(file=NullIO())
 
     def pytest_sessionstart(self, session: pytest.Session) -> None:
+        self.open_progress_file()
+
         title_msg = "test session starts"
         title: rich.console.RenderableType
         if self.no_header:
+            import rich.rule
+
             title = rich.rule.Rule(title_msg, style="default")
         else:
+            import rich.panel
+
+            from .header import generate_header_group
+
             title = rich.panel.Panel(
                 generate_header_group(session), title=title_msg, width=120
             )
         self.console.print(title)
 
+    def open_progress_file(self) -> None:
+        progress_file = self.config.getoption("modern_progress_file", None)
+        # xdist workers report to the controller, only it writes the file
+        if not progress_file or hasattr(self.config, "workerinput"):
+            return
+
+        try:
+            self.progress_fd = os.open(
+                progress_file,
+                os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND,
+                0o644,
+            )
+        except OSError as e:
+            raise pytest.UsageError(
+                f"--modern-progress-file: cannot open {progress_file}: {e.strerror}"
+            ) from e
+
     def pytest_collection(self) -> None:
         self.collect_live = new_live(console=self.console)
         self.collect_live.start()
 
+    def pytest_itemcollected(self, item: pytest.Item) -> None:
+        self.items_per_file[item.path].append(item)
+        self.items[item.nodeid] = item
+        self.total_items_collected += 1
+
     def pytest_collectreport(self, report: pytest.CollectReport) -> None:
-        items = [x for x in report.result if isinstance(x, pytest.Item)]
-        if report.failed:
-            self.collect_stats["error"].extend(items)
-        elif report.skipped:
-            self.collect_stats["skipped"].extend(items)
-
-        for item in items:
-            self.items_per_file.setdefault(item.path, []).append(item)
-            self.status_per_item[item.nodeid] = "collected"
-            self.items[item.nodeid] = item
-        self.total_items_collected += len(items)
-
-        self.collect_live.update(
-            f"[green bold]Collecting[/] [magenta]{report.nodeid}[/magenta] ([bold]{self.total_items_collected}[/] total item{plurals(self.total_items_collected)})",
-        )
-        self.collect_live.refresh()
+        if report.failed or report.skipped:
+            items = [x for x in report.result if isinstance(x, pytest.Item)]
+            self.collect_stats["error" if report.failed else "skipped"].extend(items)
+            self.unselected.update(map(id, items))
+
+        # repaint at most every 50ms, collection can emit thousands of reports,
+        # collection_finish paints the final state
+        now = time.monotonic()
+        if now - self.last_collect_refresh > 0.05:
+            total = self.total_items_collected
+            self.collect_live.update(
+                rich.text.Text.assemble(
+                    ("Collecting", "green bold"),
+                    " ",
+                    (report.nodeid, "magenta"),
+                    " (",
+                    (str(total), "bold"),
+                    f" total item{plurals(total)})",
+                ),
+                refresh=True,
+            )
+            self.last_collect_refresh = now
 
     def pytest_deselected(self, items: list[pytest.Item]) -> None:
         self.collect_stats["deselected"].extend(items)
+        self.unselected.update(map(id, items))
 
     def pytest_collection_finish(self, session: pytest.Session) -> None:
-        unselected = [item for items in self.collect_stats.values() for item in items]
+        unselected = self.unselected
         self.collect_stats["selected"] = [
-            item for item in self.items.values() if item not in unselected
+            item for item in self.items.values() if id(item) not in unselected
         ]
 
         line = f"[green bold]Collected[/] [bold]{self.total_items_collected}[/] item{plurals(self.total_items_collected)}"
@@ -180,9 +248,13 @@ class ModernTerminalReporter:
                 return root
 
             def add_to_tree(rich_tree: Tree, trie_node):
-                for node, subtree in trie_node.items():
-                    branch = rich_tree.add(node)
-                    add_to_tree(branch, subtree)
+                # children keep their order, only the walk across levels is
+                # unordered, so an explicit stack replaces the recursion
+                stack = [(rich_tree, trie_node)]
+                while stack:
+                    parent, children = stack.pop()
+                    for node, subtree in children.items():
+                        stack.append((parent.add(node), subtree))
 
             trie = build_trie([item.listchain()[1:] for item in session.items])
             tree = Tree("root")
@@ -193,16 +265,13 @@ class ModernTerminalReporter:
             self.console.print(f"[red bold]COLLECT ERROR >> {nodeid}[/]")
             self.console.print(collect_error)
 
-    def pytest_runtest_logstart(
-        self, nodeid: NodeId, location: tuple[str, int | None, str]
-    ) -> None:
-        self.test_live = new_live(console=self.console)
         self.test_live.start()
 
     def pytest_warning_recorded(
         self, warning_message: warnings.WarningMessage, nodeid: str
     ) -> None:
-        if self.config.getoption("disable_warnings"):
+        if self.disable_warnings or self.no_summary:
+            # warnings are only ever shown in the summary
             return
 
         fslocation = warning_message.filename, warning_message.lineno
@@ -210,11 +279,17 @@ class ModernTerminalReporter:
             fslocation=fslocation, message=warning_message, nodeid=nodeid
         )
         self.categorized_reports["warning"].append(warning_report)
+        self.stat_counts["warning"] += 1
 
     def pytest_exception_interact(
         self, call: pytest.CallInfo[None], report: BaseReport
     ) -> None:
         if isinstance(report, CollectReport) and call.excinfo:
+            from .traceback import ModernExceptionChainRepr
+            from .traceback import ModernExceptionInfoRepr
+
+            self.bind_code_cache()
+
             tb: rich.console.RenderableType
             if isinstance(report.longrepr, ExceptionChainRepr):
                 tb = ModernExceptionChainRepr(
@@ -230,129 +305,181 @@ class ModernTerminalReporter:
 
     def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
         status = None
-        self.test_reports[report.nodeid] = report
+        nodeid = report.nodeid
+        when = report.when
+        # reports are only kept for the summary
+        keep_report = not self.no_summary
+        if keep_report:
+            self.test_reports[nodeid] = report
 
         stage = ""
 
-        if report.when == "setup":
+        if when == "setup":
             if report.outcome == "skipped":
-                self.categorized_reports["skipped"].append(report)
+                self.stat_counts["skipped"] += 1
                 status = "skipped"
             elif report.outcome == "failed":
                 status = "failed"
                 stage = "setup"
             elif report.outcome == "passed":
                 status = "running"
-        elif report.when == "call":
+        elif when == "call":
             status, *_ = self.config.hook.pytest_report_teststatus(
                 report=report, config=self.config
             )
-            if status == "failed":
-                with suppress(Exception):
-                    crash_message: str = report.longrepr.reprcrash.message  # type: ignore
-                    if crash_message.startswith("Failed: Timeout"):
-                        status = "timeout"
-            self.categorized_reports[status].append(report)
+            if (
+                status == "failed"
+                and (reprcrash := getattr(report.longrepr, "reprcrash", None))
+                and reprcrash.message.startswith("Failed: Timeout")
+            ):
+                status = "timeout"
+            if keep_report and status in FAILED_STATUSES:
+                self.categorized_reports[status].append(report)
+            self.stat_counts[status] += 1
             self.total_duration += report.duration
-        elif report.when == "teardown":
+        elif when == "teardown":
             if report.outcome == "failed":
                 stage = "teardown"
                 status = "failed"
-                self.categorized_reports[status].append(report)
+                if keep_report:
+                    self.categorized_reports[status].append(report)
+                self.stat_counts[status] += 1
             else:
                 return
 
         assert status
-        self.status_per_item[report.nodeid] = status
-        item = self.items[report.nodeid]
-        status_param = {
-            "nodeid": report.nodeid,
-            "status": {
-                "running": lambda: "RUNNING",
-                "failed": lambda: "FAIL",
-                "passed": lambda: "PASS",
-                "xfailed": lambda: "XFAIL",
-                "xpassed": lambda: "XPASS",
-                "skipped": lambda: "SKIP",
-                "timeout": lambda: "TIMEOUT",
-                "rerun": lambda: f"RETRY {getattr(item, 'execution_count', 1)}/{get_reruns_count(item)}",
-            }.get(status, status.upper)(),
-            "color": {
-                "running": "green",
-                "failed": "red",
-                "timeout": "red",
-                "rerun": "magenta",
-                "passed": "green",
-                "xfailed": "yellow",
-                "xpassed": "yellow",
-                "skipped": "yellow",
-            }.get(status, terminal._color_for_type_default),
-            "duration": report.duration,
-        }
-        if status in ["xfailed", "skipped"]:
-            status_param["reason"] = terminal._get_raw_skip_reason(report)
+        if self.progress_fd is not None and status != "running":
+            record = {"nodeid": nodeid, "status": status, "duration": report.duration}
+            os.write(self.progress_fd, f"{json.dumps(record)}\n".encode())
+        if status == "running" and isinstance(self.test_live, NonTTYLive):
+            # without a terminal the running status is never displayed
+            return
+
+        item = self.items[nodeid]
+        label, color = STATUS_DISPLAY.get(status) or (
+            status.upper(),
+            terminal._color_for_type_default,
+        )
+        if status == "rerun":
+            label = (
+                f"RETRY {getattr(item, 'execution_count', 1)}/{get_reruns_count(item)}"
+            )
         elif (
             status == "failed"
             and hasattr(item, "execution_count")
             and getattr(item, "execution_count", 0) >= get_reruns_count(item)
         ):
-            status_param["status"] = f"TRY {get_reruns_count(item)} FAIL"
-        if stage and status == "failed":
-            status_param["reason"] = f"{stage} error"
-        self.test_live.update(new_test_status(item, **status_param))
-        self.test_live.refresh()
-
-        if status in ["failed", "timeout"]:
-            self.test_live.stop()
-            self.console.print("[red bold]stdout ───[/]")
+            label = f"TRY {get_reruns_count(item)} FAIL"
+        reason = None
+        if status in SKIPPED_STATUSES:
+            reason = terminal._get_raw_skip_reason(report)
+        elif stage and status == "failed":
+            reason = f"{stage} error"
+        self.test_status = new_test_status(
+            item,
+            nodeid,
+            label,
+            color,
+            report.duration,
+            reason,
+        )
+        if status == "running":
+            # finished statuses are printed above the live display by
+            # print_test_status, painting them into it first is a wasted refresh
+            self.test_live.update(self.test_status, refresh=True)
 
+        if status in FAILED_STATUSES:
+            renderables: list[rich.console.RenderableType] = []
             if report.capstdout:
-                self.console.print(
+                renderables.append("[red bold]stdout ───[/]")
+                renderables.append(
                     rich.padding.Padding(report.capstdout, pad=(0, 0, 0, 2))
                 )
-            self.console.print("[red bold]stderr ───[/]")
             if report.capstderr:
-                self.console.print(
+                renderables.append("[red bold]stderr ───[/]")
+                renderables.append(
                     rich.padding.Padding(report.capstderr, pad=(0, 0, 0, 2))
                 )
             if isinstance(report.longrepr, str):
-                self.console.print(
+                renderables.append(
                     rich.padding.Padding(report.longrepr, pad=(0, 0, 0, 2))
                 )
             else:
+                from .traceback import ModernExceptionChainRepr
+
+                self.bind_code_cache()
                 assert isinstance(report.longrepr, ExceptionChainRepr)
-                tb = ModernExceptionChainRepr(
-                    report.nodeid,
-                    report.longrepr,
-                    no_syntax=self.no_syntax,
+                renderables.append(
+                    ModernExceptionChainRepr(
+                        nodeid,
+                        report.longrepr,
+                        no_syntax=self.no_syntax,
+                    )
                 )
-                self.console.print(tb)
+            # the status line and its output go out in a single print
+            self.print_test_status(*renderables)
 
     def pytest_runtest_logfinish(
         self, nodeid: NodeId, location: tuple[str, int | None, str]
     ) -> None:
-        self.test_live.stop()
+        self.print_test_status()
+
+    def print_test_status(self, *renderables: rich.console.RenderableType) -> None:
+        if self.test_status is None:
+            return
+
+        if renderables:
+            self.console.print(rich.console.Group(self.test_status, *renderables))
+        else:
+            self.console.print(self.test_status)
+        self.test_status = None
+        self.test_live.update("", refresh=True)
 
     def pytest_sessionfinish(
         self, session: pytest.Session, exitstatus: int | pytest.ExitCode
     ):
-        if self.no_summary:
-            return
+        self.test_live.stop()
+        if self.progress_fd is not None:
+            os.close(self.progress_fd)
+            self.progress_fd = None
+        if not self.no_summary:
+            self.print_summary(session, exitstatus)
 
-        self.print_summary(session, exitstatus)
+        if self.code_cache_bound:
+            from .traceback import code_cache
+
+            code_cache.save()
+            # sources are not kept alive past the session in long lived processes
+            code_cache.clear()
+            self.code_cache_bound = False
+
+    def bind_code_cache(self) -> None:
+        """Let tracebacks reuse the function spans parsed by previous runs."""
+        if not self.code_cache_bound:
+            from .traceback import code_cache
+
+            # the cache is None when the cacheprovider plugin is disabled
+            code_cache.bind(getattr(self.config, "cache", None))
+            self.code_cache_bound = True
 
     def print_summary(self, session: pytest.Session, exitstatus: int | pytest.ExitCode):
+        renderables: list[rich.console.RenderableType] = []
         if benchmark_session := getattr(session.config, "_benchmarksession", None):
             from .benchmark_report import BenchmarkReport
 
-            self.console.print(BenchmarkReport(benchmark_session, self.config))
+            benchmark_report = BenchmarkReport(benchmark_session, self.config)
+            if not benchmark_report.is_empty:
+                renderables.append(benchmark_report)
 
         if coverage_plugin := self.config.pluginmanager.getplugin("_cov"):
             from .coverage_report import CoverageReport
 
-            self.console.print(CoverageReport(self.config, coverage_plugin))  # type: ignore
+            coverage_report = CoverageReport(self.config, coverage_plugin)  # type: ignore
+            if not coverage_report.is_empty:
+                renderables.append(coverage_report)
 
-        self.console.print(self.summary(session, exitstatus))
+        renderables.append(self.summary(session, exitstatus))
+        self.console.print(rich.console.Group(*renderables))
 
     @rich.console.group()
     def summary(
@@ -360,101 +487,90 @@ class ModernTerminalReporter:
     ) -> rich.console.RenderResult:
         yield "──────────"
         session_duration = format_node_duration(self.total_duration)
-        stat_counts = {
-            stat_type: len(reports)
-            for stat_type, reports in self.categorized_reports.items()
-        }
-        color_for_type = {
-            **terminal._color_for_type,
-            "deselected": "bright_black",
-            "timeout": "red",
-        }
+        stat_counts = self.stat_counts
+        default_color = terminal._color_for_type_default
         stats = ", ".join(
-            f"[bold]{count}[/] [bold {color_for_type.get(stat_type, terminal._color_for_type_default)}]{stat_type}[/]"
-            for stat_type, count in stat_counts.items()
-            if count > 0
+            [
+                f"[bold]{count}[/] [bold {COLOR_FOR_TYPE.get(stat_type, default_color)}]{stat_type}[/]"
+                for stat_type, count in stat_counts.items()
+                if count > 0
+            ]
         )
         summary_color = "green" if exitstatus == 0 else "red"
         yield (
             f"   [{summary_color} bold]Summary[/] [{session_duration:>10s}] [bold]{sum(stat_counts.values())}[/] tests run: {stats}"
         )
 
-        for failed_status in ["failed", "timeout"]:
-            for failed_report in self.categorized_reports.get(failed_status, []):
-                try:
-                    crash_message = (
-                        failed_report.longrepr.reprcrash.message.splitlines()[0]
-                    )  # type: ignore
-                    crash_message = rich.syntax.Syntax(
-                        crash_message,
-                        "python" if not self.no_syntax else "text",
-                        theme="ansi_dark",
-                    ).highlight(crash_message)
-                    crash_message.rstrip()
-                except Exception:
-                    crash_message = ""
-                if failed_status == "failed":
-                    duration = format_node_duration(failed_report.duration)
-                    yield rich.text.Text.assemble(
-                        rich.text.Text.from_markup(
-                            f"[red bold]{'FAIL':>10s}[/] [{duration:>10s}] [red bold]{failed_report.nodeid}[/]"
-                        ),
-                        " ",
-                        crash_message,
-                    )
-                elif failed_status == "timeout":
-                    item = self.items[failed_report.nodeid]
-                    timeout = pad_duration(get_timeout(item), ">")
-                    yield (
-                        f"[red bold]{'TIMEOUT':>10s}[/] [{timeout}] [red bold]{failed_report.nodeid}[/]"
-                    )
+        import rich.syntax
+
+        syntax = rich.syntax.Syntax("", "python", theme="ansi_dark")
+
+        # parametrized tests tend to fail with the same message over and over
+        highlighted: dict[str, rich.text.Text] = {}
+
+        def highlight(code: str) -> rich.text.Text:
+            if (text := highlighted.get(code)) is None:
+                # pygments is skipped entirely when highlighting is disabled
+                text = (
+                    rich.text.Text(code) if self.no_syntax else syntax.highlight(code)
+                )
+                text.rstrip()
+                highlighted[code] = text
+            return text
+
+        for failed_report in self.categorized_reports["failed"]:
+            crash_message: rich.text.Text | str = ""
+            if (reprcrash := getattr(failed_report.longrepr, "reprcrash", None)) and (
+                crash_lines := reprcrash.message.splitlines()
+            ):
+                crash_message = highlight(crash_lines[0])
+            duration = format_node_duration(failed_report.duration)
+            yield rich.text.Text.assemble(
+                rich.text.Text.from_markup(
+                    f"[red bold]{'FAIL':>10s}[/] [{duration:>10s}] [red bold]{failed_report.nodeid}[/]"
+                ),
+                " ",
+                crash_message,
+            )
 
-        for warning_report in self.categorized_reports.get("warning", []):
+        for timeout_report in self.categorized_reports["timeout"]:
+            item = self.items[timeout_report.nodeid]
+            timeout = pad_duration(get_timeout(item), ">")
+            yield (
+                f"[red bold]{'TIMEOUT':>10s}[/] [{timeout}] [red bold]{timeout_report.nodeid}[/]"
+            )
+
+        for warning_report in self.categorized_reports["warning"]:
             if not warning_report.nodeid:
                 # from pytest warning
                 continue
             test_report = self.test_reports[warning_report.nodeid]
             duration = pad_duration(test_report.duration)
-            warn_message = rich.syntax.Syntax(
-                repr(warning_report.message.message),
-                "python" if not self.no_syntax else "text",
-                theme="ansi_dark",
-            ).highlight(repr(warning_report.message.message))
-            warn_message.rstrip()
             yield rich.text.Text.assemble(
                 rich.text.Text.from_markup(
                     f"[yellow bold]{'WARN':>10s}[/] [{duration}] [yellow bold]{warning_report.nodeid}[/]"
                 ),
                 " ",
-                warn_message,
+                highlight(repr(warning_report.message.message)),
             )
 
     def pytest_internalerror(self, excrepr: ExceptionRepr) -> bool:
         highlighter = ReprHighlighter() if not self.no_syntax else lambda x: x
-        for line in str(excrepr).splitlines():
-            self.console.print("[red bold]INTERNALERROR>[/]", highlighter(line))
+        prefix = rich.text.Text("INTERNALERROR>", style="red bold")
+        self.console.print(
+            rich.console.Group(
+                *[
+                    rich.text.Text.assemble(prefix, " ", highlighter(line))
+                    for line in str(excrepr).splitlines()
+                ]
+            )
+        )
         return True
 
-    @property
-    def no_color(self) -> bool:
-        return self.config.getoption("color") == "no"
-
-    @property
-    def no_header(self) -> bool:
-        return self.config.getoption("no_header")  # type: ignore
-
-    @property
-    def no_summary(self) -> bool:
-        return self.config.getoption(name="no_summary")  # type: ignore
-
-    @property
-    def no_syntax(self) -> bool:
-        return self.config.getoption("code_highlight") == "no"  # type: ignore
-
 
 def plurals(items: Collection | int) -> str:
-    count = items if isinstance(items, int) else len(items)
-    return "s" if count > 1 else ""
+    count = items if type(items) is int else len(items)
+    return "" if count == 1 else "s"
 
 
 def new_test_status(
@@ -465,49 +581,34 @@ def new_test_status(
     duration: float = 0,
     reason: str | None = None,
 ) -> rich.text.Text:
-    fspath, *extra = nodeid.split("::")
-
     if status == "TIMEOUT":
         duration_text = f"[{pad_duration(get_timeout(item), '>')}]"
     else:
         duration_text = f"[{pad_duration(duration)}]"
 
     text = rich.text.Text.assemble(
-        (f"{status:>10s}", rich.style.Style(color=color, bold=True)),
-        " ",
-        duration_text,
-        " ",
-        (fspath, rich.style.Style(color="cyan", bold=True)),
-        ("::", rich.style.Style(color="blue")),
-        "",
-        (
-            "::".join(extra),
-            rich.style.Style(color="blue", bold=True),
-        ),
-        " ",
-        f"({reason})" if reason else "",
+        (f"{status:>10s}", status_style(color)),
+        f" {duration_text} ",
+        node_id_text(nodeid),
     )
-    text.rstrip()
+    if reason:
+        text.append(f" ({reason})")
     return text
 
 
-def node_id_text(nodeid: str) -> str:
-    fspath, *extra = nodeid.split("::")
-    func = "[blue]::[/]".join(f"[bold blue]{f}[/]" for f in extra)
-    return f"[bold cyan]{fspath}[/][cyan]::[/][bold blue]{func}[/]"
-
+@cache
+def status_style(color: str) -> rich.style.Style:
+    return rich.style.Style(color=color, bold=True)
 
-class CodeCache:
-    def __init__(self):
-        self.cache: dict[str, str] = {}
 
-    def read_code(self, filename: str) -> str:
-        code = self.cache.get(filename)
-        if not code:
-            with open(filename, encoding="utf-8", errors="replace") as code_file:
-                code = code_file.read()
-            self.cache[filename] = code
-        return code
+@lru_cache(maxsize=4096)
+def node_id_text(nodeid: str) -> rich.text.Text:
+    fspath, *extra = nodeid.split("::")
+    return rich.text.Text.assemble(
+        (fspath, rich.style.Style(color="cyan", bold=True)),
+        ("::", rich.style.Style(color="blue")),
+        ("::".join(extra), rich.style.Style(color="blue", bold=True)),
+    )
 
 
 def new_live(*args, **kwargs) -> rich.live.Live:
@@ -526,9 +627,12 @@ class NonTTYLive(rich.live.Live):
         return
 
     def stop(self) -> None:
+        if self.transient:
+            return
         if not self.printed:
-            # make sure only printed once
-            self.console.print(self.renderable)
+            # make sure only printed once, and never as a blank line
+            if renderable := self.renderable:
+                self.console.print(renderable)
             self.printed = True
 
 
@@ -540,43 +644,28 @@ class Live(rich.live.Live):
         return super().refresh()
 
 
-code_cache = CodeCache()
+class NullIO(io.TextIOBase):
+    """A text sink that discards writes without reaching the OS."""
+
+    def write(self, s: str) -> int:
+        return len(s)
 
 
 def trim_io_space(f: IO[str]) -> IO[str]:
     class Wrapper:
         def __init__(self, f: IO[str]):
             self.f = f
-            self.buffer = ""
+            self.buffer: list[str] = []
 
         def write(self, data):
             # Accumulate data in buffer
-            self.buffer += data
+            self.buffer.append(data)
 
         def flush(self):
-            # Split buffer into lines, strip trailing spaces, and write
+            # Strip trailing spaces of every line, and write
             if self.buffer:
-                lines = self.buffer.splitlines(keepends=True)
-                for line in lines:
-                    # Remove trailing whitespace before line ending
-                    if line.endswith(("\n", "\r")):
-                        # Find the line ending
-                        line_ending = ""
-                        if line.endswith("\r\n"):
-                            line_ending = "\r\n"
-                            content = line[:-2]
-                        elif line.endswith("\n"):
-                            line_ending = "\n"
-                            content = line[:-1]
-                        elif line.endswith("\r"):
-                            line_ending = "\r"
-                            content = line[:-1]
-                        else:
-                            content = line
-                        self.f.write(content.rstrip() + line_ending)  # type: ignore
-                    else:
-                        self.f.write(line.rstrip())  # type: ignore
-                self.buffer = ""
+                self.f.write(TRAILING_SPACE_RE.sub("", "".join(self.buffer)))  # type: ignore
+                self.buffer.clear()
             self.f.flush()
 
         def __getattr__(self, name):
@@ -585,12 +674,25 @@ def trim_io_space(f: IO[str]) -> IO[str]:
     return Wrapper(f)  # type: ignore
 
 
+# markers and options don't change during the run, resolve them once per item
+reruns_count_key = pytest.StashKey[int]()
+timeout_key = pytest.StashKey[float]()
+
+
 def get_reruns_count(item: pytest.Item) -> int:
-    return int(get_marker_value(item, "flaky", "reruns"))
+    if (count := item.stash.get(reruns_count_key, None)) is None:
+        count = item.stash[reruns_count_key] = int(
+            get_marker_value(item, "flaky", "reruns")
+        )
+    return count
 
 
 def get_timeout(item: pytest.Item) -> float:
-    return float(get_marker_value(item, "timeout", "timeout"))
+    if (timeout := item.stash.get(timeout_key, None)) is None:
+        timeout = item.stash[timeout_key] = float(
+            get_marker_value(item, "timeout", "timeout")
+        )
+    return timeout
 
 
 def get_marker_value(
@@ -618,24 +720,28 @@ def get_marker_value(
     return value
 
 
+# durations below a minute: format of the first threshold the value is below
+DURATION_THRESHOLDS = (0.00001, 0.0001, 0.001, 0.01, 0.1, 1)
+DURATION_FORMATS = (
+    (1000000, 3, "us"),
+    (1000000, 2, "us"),
+    (1000000, 1, "us"),
+    (1000, 3, "ms"),
+    (1000, 2, "ms"),
+    (1000, 1, "ms"),
+    (1, 3, "s"),
+)
+
+
 def format_node_duration(seconds: float) -> str:
     """Format the given seconds in a human readable manner to show in the test progress."""
     # The formatting is designed to be compact and readable, with at most 7 characters
     # for durations below 100 hours.
-    if seconds < 0.00001:
-        return f" {seconds * 1000000:.3f}us"
-    if seconds < 0.0001:
-        return f" {seconds * 1000000:.2f}us"
-    if seconds < 0.001:
-        return f" {seconds * 1000000:.1f}us"
-    if seconds < 0.01:
-        return f" {seconds * 1000:.3f}ms"
-    if seconds < 0.1:
-        return f" {seconds * 1000:.2f}ms"
-    if seconds < 1:
-        return f" {seconds * 1000:.1f}ms"
     if seconds < 60:
-        return f" {seconds:.3f}s"
+        scale, precision, unit = DURATION_FORMATS[
+            bisect_right(DURATION_THRESHOLDS, seconds)
+        ]
+        return f" {seconds * scale:.{precision}f}{unit}"
     if seconds < 3600:
         return f" {seconds // 60:.0f}m {seconds % 60:.0f}s"
     return f" {seconds // 3600:.0f}h {(seconds % 3600) // 60:.0f}m"
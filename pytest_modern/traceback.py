@@ -5,11 +5,13 @@ This implementation is inspired by https://github.com/nicoddemus/pytest-rich/blo
 from __future__ import annotations
 
 import ast
+import os
 
+from bisect import bisect_right
 from contextlib import suppress
 from dataclasses import dataclass
 from dataclasses import field
-from pathlib import Path
+from functools import lru_cache
 from typing import TYPE_CHECKING
 from typing import Generic
 from typing import TypeVar
@@ -40,13 +42,221 @@ from rich.syntax import SyntaxTheme
 from rich.text import Text
 from rich.theme import Theme
 from rich.traceback import PathHighlighter
+from rich.traceback import Traceback
 
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
     from collections.abc import Sequence
 
+    import pytest
+
 _ErrT = TypeVar("_ErrT")
 
+FunctionSpans = tuple[list[int], list[tuple[int, int, str]]]
+FUNCTION_SPANS_KEY = "modern/function_spans"
+MAX_WINDOWS_PER_FILE = 32
+
+
+class CodeCache:
+    """Source files and their function spans, shared by every traceback."""
+
+    __slots__ = (
+        "cache",
+        "lines",
+        "spans",
+        "store",
+        "stored",
+        "stored_changed",
+        "used",
+        "windows",
+    )
+
+    def __init__(self):
+        # filename -> (mtime, size, code)
+        self.cache: dict[str, tuple[int, int, str]] = {}
+        self.lines: dict[str, list[str]] = {}
+        # filename -> the Syntax windows already built, reruns and failing tests
+        # in the same file show the same lines again
+        self.windows: dict[str, dict[tuple, Syntax]] = {}
+        # filename -> (sorted start lines, sorted (start, end, name) of every function)
+        self.spans: dict[str, FunctionSpans] = {}
+        # spans persisted in the pytest cache between runs, keyed by filename and
+        # only trusted while the file mtime and size are unchanged
+        self.store: pytest.Cache | None = None
+        self.stored: dict[str, list] | None = None
+        self.stored_changed = False
+        # only the entries of files shown this session are saved, so files that
+        # stopped failing or no longer exist drop out of the store
+        self.used: dict[str, list] = {}
+
+    def bind(self, store: pytest.Cache | None) -> None:
+        if store is not self.store:
+            self.store = store
+            self.stored = None
+            self.stored_changed = False
+            self.used = {}
+
+    def save(self) -> None:
+        if self.store is not None and self.stored_changed:
+            self.store.set(FUNCTION_SPANS_KEY, self.used)
+            self.stored_changed = False
+
+    def clear(self) -> None:
+        self.cache.clear()
+        self.lines.clear()
+        self.spans.clear()
+        self.windows.clear()
+        self.bind(None)
+
+    def read_code(self, filename: str) -> str:
+        # files may be edited between runs of a long lived session (e.g. a watcher),
+        # so the cached code is only reused while the mtime and size are unchanged,
+        # the size catches edits within the mtime granularity
+        stat = os.stat(filename)
+        mtime, size = stat.st_mtime_ns, stat.st_size
+        cached = self.cache.get(filename)
+        if cached is not None and cached[0] == mtime and cached[1] == size:
+            return cached[2]
+
+        with open(filename, "rb") as code_file:
+            code = code_file.read().decode("utf-8", "replace")
+        # the same universal newlines a text mode read would give, only "\n"
+        # separates lines afterwards
+        code = code.replace("\r\n", "\n").replace("\r", "\n")
+        self.cache[filename] = (mtime, size, code)
+        self.lines.pop(filename, None)
+        self.spans.pop(filename, None)
+        self.windows.pop(filename, None)
+        return code
+
+    def read_lines(self, filename: str) -> list[str]:
+        code = self.read_code(filename)
+        # lines are dropped by read_code whenever it rereads a changed file
+        if (lines := self.lines.get(filename)) is None:
+            # python only ends lines on "\n", splitlines would also break on
+            # form feeds and other separators and shift the line numbers
+            lines = code.split("\n")
+            if not lines[-1]:
+                lines.pop()
+            self.lines[filename] = lines
+        return lines
+
+    def function_spans(self, filename: str) -> FunctionSpans:
+        # spans are dropped by read_code whenever it rereads a changed file
+        if (spans := self.spans.get(filename)) is not None:
+            return spans
+
+        code = None
+        with suppress(OSError):
+            code = self.read_code(filename)
+
+        functions: list[tuple[int, int, str]] = []
+        if code:
+            mtime, size, _ = self.cache[filename]
+            entry = self.load_stored().get(filename)
+            if is_spans_entry(entry) and entry[0] == mtime and entry[1] == size:
+                functions = [tuple(function) for function in entry[2]]
+            else:
+                with suppress(SyntaxError, ValueError):
+                    functions = sorted(
+                        (node.lineno, node.end_lineno, node.name)
+                        for node in iter_functions(ast.parse(code))
+                        if node.end_lineno is not None
+                    )
+                entry = [mtime, size, functions]
+                self.stored_changed = True
+            if self.store is not None:
+                self.used[filename] = entry
+        spans = self.spans[filename] = ([start for start, _, _ in functions], functions)
+        return spans
+
+    def load_stored(self) -> dict[str, list]:
+        if self.stored is None:
+            self.stored = {}
+            if self.store is not None:
+                stored = self.store.get(FUNCTION_SPANS_KEY, None)
+                if isinstance(stored, dict):
+                    self.stored = stored
+        return self.stored
+
+
+def is_spans_entry(entry: list | None) -> bool:
+    """Whether a persisted entry is a [mtime, size, [[start, end, name], ...]] list."""
+    return (
+        isinstance(entry, list)
+        and len(entry) == 3
+        and type(entry[0]) is int
+        and type(entry[1]) is int
+        and isinstance(entry[2], list)
+        and all(
+            isinstance(function, list)
+            and len(function) == 3
+            and type(function[0]) is int
+            and type(function[1]) is int
+            and isinstance(function[2], str)
+            for function in entry[2]
+        )
+    )
+
+
+code_cache = CodeCache()
+
+# highlighters keep no state between calls, one of each serves every traceback
+REPR_HIGHLIGHTER = ReprHighlighter()
+NULL_HIGHLIGHTER = rich.highlighter.NullHighlighter()
+PATH_HIGHLIGHTER = PathHighlighter()
+ERROR_STYLE = Style(color="red")
+
+# nodes whose children may define functions, expressions never do
+STATEMENT_NODES: tuple[type[ast.AST], ...] = (
+    ast.stmt,
+    ast.excepthandler,
+    *((ast.match_case,) if hasattr(ast, "match_case") else ()),
+)
+
+
+def iter_functions(tree: ast.AST) -> Iterator[ast.FunctionDef | ast.AsyncFunctionDef]:
+    """Yield every function definition, without visiting expression subtrees."""
+    stack = [tree]
+    while stack:
+        for child in ast.iter_child_nodes(stack.pop()):
+            if isinstance(child, STATEMENT_NODES):
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    yield child
+                stack.append(child)
+
+
+@lru_cache(maxsize=8)
+def get_syntax_theme(theme: str) -> SyntaxTheme:
+    return Syntax.get_theme(theme)
+
+
+@lru_cache(maxsize=8)
+def get_traceback_theme(theme: str) -> Theme:
+    """The console theme for tracebacks, built once per syntax theme."""
+    token_style = get_syntax_theme(theme).get_style_for_token
+    return Theme(
+        {
+            "pretty": token_style(TextToken),
+            "pygments.text": token_style(Token),
+            "pygments.string": token_style(String),
+            "pygments.function": token_style(Name.Function),
+            "pygments.number": token_style(Number),
+            "repr.indent": token_style(Comment) + Style(dim=True),
+            "repr.str": token_style(String),
+            "repr.brace": token_style(TextToken) + Style(bold=True),
+            "repr.number": token_style(Number),
+            "repr.bool_true": token_style(Keyword.Constant),
+            "repr.bool_false": token_style(Keyword.Constant),
+            "repr.none": token_style(Keyword.Constant),
+            "scope.equals": token_style(Operator),
+            "scope.key": token_style(Name),
+            "scope.key.special": token_style(Name.Constant) + Style(dim=True),
+        },
+        inherit=False,
+    )
+
 
 @dataclass
 class ModernErrorRepr(Generic[_ErrT]):
@@ -58,34 +268,11 @@ class ModernErrorRepr(Generic[_ErrT]):
     word_wrap: bool = True
     indent_guides: bool = True
     error_messages: list[str] = field(default_factory=list)
-    code_cache: dict[str, str | None] = field(default_factory=dict)
 
     def __rich_console__(
         self, console: Console, options: ConsoleOptions
     ) -> RenderResult:
-        theme = self.get_theme()
-        token_style = theme.get_style_for_token
-
-        traceback_theme = Theme(
-            {
-                "pretty": token_style(TextToken),
-                "pygments.text": token_style(Token),
-                "pygments.string": token_style(String),
-                "pygments.function": token_style(Name.Function),
-                "pygments.number": token_style(Number),
-                "repr.indent": token_style(Comment) + Style(dim=True),
-                "repr.str": token_style(String),
-                "repr.brace": token_style(TextToken) + Style(bold=True),
-                "repr.number": token_style(Number),
-                "repr.bool_true": token_style(Keyword.Constant),
-                "repr.bool_false": token_style(Keyword.Constant),
-                "repr.none": token_style(Keyword.Constant),
-                "scope.equals": token_style(Operator),
-                "scope.key": token_style(Name),
-                "scope.key.special": token_style(Name.Constant) + Style(dim=True),
-            },
-            inherit=False,
-        )
+        traceback_theme = get_traceback_theme(self.theme)
 
         with console.use_theme(traceback_theme):
             yield rich.padding.Padding(self._render(self.error, options), (0, 0, 0, 2))
@@ -96,80 +283,73 @@ class ModernErrorRepr(Generic[_ErrT]):
 
     @property
     def highlighter(self) -> rich.highlighter.Highlighter:
-        return (
-            ReprHighlighter()
-            if not self.no_syntax
-            else rich.highlighter.NullHighlighter()
-        )
+        return NULL_HIGHLIGHTER if self.no_syntax else REPR_HIGHLIGHTER
 
-    def read_code(self, filename: str) -> str | None:
+    def read_lines(self, filename: str) -> list[str] | None:
         """
-        Read files and cache results on filename.
+        Read the lines of a file, split once per file and cached like the code.
 
         Args:
             filename (str): Filename to read
 
         Returns:
-            str: Contents of file
+            list[str]: Lines of file
         """
-        code = self.code_cache.get(filename)
-
-        if not code:
-            with suppress(OSError):
-                code = Path(filename).read_text("utf-8", "replace")
-            self.code_cache[filename] = code
-        return code
+        with suppress(OSError):
+            return code_cache.read_lines(filename)
+        return None
 
     def get_funcname(self, lineno: int, filename: str) -> str:
         """
-        Given a line number in a file, using `ast.parse` walk backwards
-        until we find the function name.
+        Given a line number in a file, find the name of the innermost
+        function enclosing it, parsing each file with `ast.parse` only once.
 
         Args:
             lineno (int): Line number to start searching from
             filename (str): Filename to read
 
         Returns:
-            str: Function name
+            str: Function name, `<module>` outside of any function like
+                the frame names rich reports
         """
-        if code := self.read_code(filename):
-            tree = ast.parse(code)
-            for node in ast.walk(tree):
-                if (
-                    isinstance(node, ast.FunctionDef)
-                    and node.end_lineno is not None
-                    and node.lineno <= lineno <= node.end_lineno
-                ):
-                    return node.name
-        return "???"
+        starts, spans = code_cache.function_spans(filename)
+        # nested functions start after their parent, so the closest enclosing
+        # span is the first one found walking back from the last start <= lineno
+        for index in range(bisect_right(starts, lineno) - 1, -1, -1):
+            _, end, name = spans[index]
+            if lineno <= end:
+                return name
+        return "<module>"
 
     def get_args(self, reprfuncargs: Sequence) -> Text:
-        args = Text("")
-        for arg in reprfuncargs:
-            assert isinstance(arg[1], str)
-            args.append(
-                Text.assemble(
-                    (arg[0], "name.variable"),
-                    (" = ", "repr.equals"),
-                    (arg[1], self.get_lexer("token")),
-                )
+        value_style = self.get_lexer("token")
+        # one assemble for every argument instead of a Text per argument
+        parts: list[str | tuple[str, str]] = []
+        for name, value in reprfuncargs:
+            if parts:
+                parts.append(", ")
+            parts += (
+                (name, "name.variable"),
+                (" = ", "repr.equals"),
+                (value, value_style),
             )
-            if reprfuncargs[-1] != arg:
-                args.append(Text(", "))
-        return args
+        return Text.assemble(*parts)
 
-    def get_error_source(self, lines: Sequence[str]) -> str:
-        for line in lines:
-            if line.startswith(">"):
-                return line.split(">")[1].strip()
-        return ""
+    def get_error_lines(self, lines: Sequence[str]) -> tuple[str, list[str]]:
+        """
+        Split the lines of a traceback entry in a single pass.
 
-    def get_err_msgs(self, lines: Sequence[str]) -> list[str]:
+        Returns:
+            tuple[str, list[str]]: The first `>` source line and the `E` messages
+        """
+        error_source = ""
         err_lines = []
         for line in lines:
             if line.startswith("E"):
                 err_lines.append(line[1:].strip())
-        return err_lines
+            elif not error_source and line.startswith(">"):
+                error_source = line[1:].strip()
+        return error_source, err_lines
 
     def get_theme(self) -> SyntaxTheme:
         """
@@ -179,7 +359,54 @@ class ModernErrorRepr(Generic[_ErrT]):
         string through Rich's Syntax class to get the actual SyntaxTheme
         object.
         """
-        return Syntax.get_theme(self.theme)
+        return get_syntax_theme(self.theme)
+
+    def get_syntax(
+        self, filename: str, lines: list[str], lineno: int, theme: SyntaxTheme
+    ) -> Syntax:
+        """
+        Build the Syntax showing `extra_lines` around `lineno`.
+
+        Pygments lexes from the closest function definition at or above the
+        window instead of the top of the file, a window opening inside a
+        multi-line string is still highlighted from a statement boundary.
+        The most recent windows are cached per file until its source changes.
+        """
+        windows = code_cache.windows.setdefault(filename, {})
+        key = (
+            lineno,
+            self.extra_lines,
+            self.theme,
+            self.word_wrap,
+            self.indent_guides,
+            self.no_syntax,
+        )
+        if (syntax := windows.get(key)) is not None:
+            return syntax
+
+        if len(windows) >= MAX_WINDOWS_PER_FILE:
+            # dicts keep insertion order, the oldest window goes first
+            del windows[next(iter(windows))]
+        start = max(lineno - self.extra_lines, 1)
+        end = lineno + self.extra_lines
+        # def lines always begin a statement, line 1 is the fallback
+        starts, _ = code_cache.function_spans(filename)
+        index = bisect_right(starts, start) - 1
+        first = starts[index] if index >= 0 else 1
+        syntax = windows[key] = Syntax(
+            "\n".join(lines[first - 1 : end]),
+            self.get_lexer("python"),
+            theme=theme,
+            line_numbers=True,
+            start_line=first,
+            line_range=(start - first + 1, end - first + 1),
+            highlight_lines={lineno},
+            word_wrap=self.word_wrap,
+            code_width=120,
+            indent_guides=self.indent_guides,
+            dedent=False,
+        )
+        return syntax
 
     def get_lexer(self, lexer: str) -> str:
         return "text" if self.no_syntax else lexer
@@ -191,21 +418,27 @@ class ModernExceptionChainRepr(ModernErrorRepr[ExceptionChainRepr]):
     def _render(
         self, chain: ExceptionChainRepr, options: ConsoleOptions
     ) -> RenderResult:
-        path_highlighter = PathHighlighter()
         repr_highlighter = self.highlighter
         theme = self.get_theme()
+        line_pointer = "> " if options.legacy_windows else "❱ "
+        exc_type_style = self.get_lexer("traceback.exc_type")
 
-        for _, entry in loop_last(chain.reprtraceback.reprentries):
+        # entries of a chain often share files, read each one once
+        sources: dict[str, list[str] | None] = {}
+        for entry in chain.reprtraceback.reprentries:
             assert isinstance(entry, ReprEntry)
 
             assert entry.reprfileloc is not None
             filename = entry.reprfileloc.path
             lineno = entry.reprfileloc.lineno
+            if filename not in sources:
+                sources[filename] = self.read_lines(filename)
+            lines = sources[filename]
             funcname = self.get_funcname(lineno, filename)
             message = entry.reprfileloc.message
 
             text = Text.assemble(
-                path_highlighter(Text(filename, style="pygments.string")),
+                PATH_HIGHLIGHTER(Text(filename, style="pygments.string")),
                 (":", "pygments.text"),
                 (str(lineno), "pygments.number"),
                 " in ",
@@ -219,41 +452,27 @@ class ModernExceptionChainRepr(ModernErrorRepr[ExceptionChainRepr]):
                 if args:
                     yield args
 
-            if code := self.read_code(filename):
-                syntax = Syntax(
-                    code,
-                    self.get_lexer("python"),
-                    theme=theme,
-                    line_numbers=True,
-                    line_range=(
-                        lineno - self.extra_lines,
-                        lineno + self.extra_lines,
-                    ),
-                    highlight_lines={lineno},
-                    word_wrap=self.word_wrap,
-                    code_width=120,
-                    indent_guides=self.indent_guides,
-                    dedent=False,
-                )
+            if lines:
+                syntax = self.get_syntax(filename, lines, lineno, theme)
                 yield ""
                 yield syntax
 
             if message:
-                line_pointer = "> " if options.legacy_windows else "❱ "
                 yield ""
                 yield Text.assemble(
                     (str(lineno), "pygments.number"),
                     ": ",
-                    (message, self.get_lexer("traceback.exc_type")),
+                    (message, exc_type_style),
                 )
+                error_source, err_msgs = self.get_error_lines(entry.lines)
                 yield Text.assemble(
-                    (line_pointer, Style(color="red")),
-                    repr_highlighter(self.get_error_source(entry.lines)),
+                    (line_pointer, ERROR_STYLE),
+                    repr_highlighter(error_source),
                 )
-                for err_msg in self.get_err_msgs(entry.lines):
+                for err_msg in err_msgs:
                     self.error_messages.append(err_msg)
                     yield Text.assemble(
-                        ("E ", Style(color="red")),
+                        ("E ", ERROR_STYLE),
                         repr_highlighter(err_msg),
                     )
 
@@ -262,8 +481,6 @@ class ModernExceptionChainRepr(ModernErrorRepr[ExceptionChainRepr]):
 class ModernExceptionInfoRepr(ModernErrorRepr[ExceptionInfo]):
     @group()
     def _render(self, error: ExceptionInfo, options: ConsoleOptions) -> RenderResult:
-        from rich.traceback import Traceback
-
         traceback = Traceback.from_exception(
             type(error.value),
             error.value,
@@ -272,17 +489,22 @@ class ModernExceptionInfoRepr(ModernErrorRepr[ExceptionInfo]):
             locals_hide_sunder=True,
         )
 
-        path_highlighter = PathHighlighter()
         theme = self.get_theme()
 
+        sources: dict[str, list[str] | None] = {}
         for last, stack in loop_last(reversed(traceback.trace.stacks)):
             for frame in stack.frames:
                 filename = frame.filename
                 lineno = frame.lineno
-                funcname = self.get_funcname(lineno, filename)
+                if filename not in sources:
+                    sources[filename] = self.read_lines(filename)
+                lines = sources[filename]
+                # rich already knows the frame's function, the source is only
+                # parsed when it does not
+                funcname = frame.name or self.get_funcname(lineno, filename)
 
                 text = Text.assemble(
-                    path_highlighter(Text(filename, style="pygments.string")),
+                    PATH_HIGHLIGHTER(Text(filename, style="pygments.string")),
                     (":", "pygments.text"),
                     (str(lineno), "pygments.number"),
                     " in ",
@@ -291,22 +513,8 @@ class ModernExceptionInfoRepr(ModernErrorRepr[ExceptionInfo]):
                 )
                 yield text
 
-                if code := self.read_code(filename):
-                    syntax = Syntax(
-                        code,
-                        self.get_lexer("python"),
-                        theme=theme,
-                        line_numbers=True,
-                        line_range=(
-                            lineno - self.extra_lines,
-                            lineno + self.extra_lines,
-                        ),
-                        highlight_lines={lineno},
-                        word_wrap=self.word_wrap,
-                        code_width=120,
-                        indent_guides=self.indent_guides,
-                        dedent=False,
-                    )
+                if lines:
+                    syntax = self.get_syntax(filename, lines, lineno, theme)
                     yield ""
                     yield syntax
 
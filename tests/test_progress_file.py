@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+
+pytest_plugins = ["pytester"]
+
+
+def test_progress_file(pytester: pytest.Pytester):
+    pytester.makepyfile(
+        test_sample="""
+        def test_ok():
+            pass
+
+        def test_ko():
+            assert False
+        """
+    )
+    progress_file = pytester.path / "progress.jsonl"
+
+    pytester.runpytest("--modern-progress-file", str(progress_file))
+
+    records = [json.loads(line) for line in progress_file.read_text().splitlines()]
+    assert [(record["nodeid"], record["status"]) for record in records] == [
+        ("test_sample.py::test_ok", "passed"),
+        ("test_sample.py::test_ko", "failed"),
+    ]
+    assert all(isinstance(record["duration"], float) for record in records)
+
+
+def test_progress_file_bad_path(pytester: pytest.Pytester):
+    progress_file = pytester.path / "missing" / "progress.jsonl"
+
+    result = pytester.runpytest("--modern-progress-file", str(progress_file))
+
+    assert result.ret == pytest.ExitCode.USAGE_ERROR
+    result.stderr.fnmatch_lines(["*--modern-progress-file: cannot open*"])
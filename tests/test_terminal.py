@@ -0,0 +1,40 @@
+import pytest
+
+
+pytest_plugins = ["pytester"]
+
+
+@pytest.mark.parametrize(
+    ("test_name", "headers"),
+    [
+        ("test_silent", []),
+        ("test_stdout", ["stdout ───"]),
+        ("test_stderr", ["stderr ───"]),
+    ],
+)
+def test_captured_output_headers(
+    pytester: pytest.Pytester, test_name: str, headers: list[str]
+):
+    pytester.makepyfile(
+        test_sample="""
+        import sys
+
+        def test_silent():
+            assert False
+
+        def test_stdout():
+            print("to stdout")
+            assert False
+
+        def test_stderr():
+            sys.stderr.write("to stderr\\n")
+            assert False
+        """
+    )
+
+    result = pytester.runpytest("--color=no", f"test_sample.py::{test_name}")
+
+    output = result.stdout.str()
+    assert [
+        header for header in ("stdout ───", "stderr ───") if header in output
+    ] == headers
@@ -0,0 +1,143 @@
+import io
+import json
+import os
+
+from pathlib import Path
+
+import pytest
+
+from pygments.token import Keyword
+from rich.console import Console
+
+from pytest_modern.traceback import ModernErrorRepr
+from pytest_modern.traceback import code_cache
+from pytest_modern.traceback import get_syntax_theme
+
+
+pytest_plugins = ["pytester"]
+
+
+def render_window(path: Path, lineno: int) -> list[tuple[str, str]]:
+    error_repr = ModernErrorRepr("nodeid", None)
+    filename = str(path)
+    syntax = error_repr.get_syntax(
+        filename, code_cache.read_lines(filename), lineno, error_repr.get_theme()
+    )
+    console = Console(file=io.StringIO(), width=120)
+    return [
+        (segment.text, str(segment.style))
+        for segment in console.render(syntax)
+        if segment.text.strip()
+    ]
+
+
+def test_window_below_docstring(tmp_path: Path):
+    path = tmp_path / "sample.py"
+    path.write_text(
+        "def test_value():\n"
+        '    """\n'
+        "    A docstring\n"
+        "    spanning lines\n"
+        '    """\n'
+        "    value = 2\n"
+        "    assert value == 3\n"
+    )
+
+    segments = render_window(path, 7)
+
+    keyword_style = str(get_syntax_theme("ansi_dark").get_style_for_token(Keyword))
+    assert ("assert", keyword_style) in segments
+
+
+def test_lines_split_on_newlines_only(tmp_path: Path):
+    path = tmp_path / "sample.py"
+    path.write_bytes(
+        b"def test_value():\r\n"
+        b"    x = 1\r\n"
+        b"\x0c\r\n"
+        b"    # separated by a form feed\n"
+        b"    y = 2\r"
+        b"    assert y == 3\n"
+    )
+
+    lines = code_cache.read_lines(str(path))
+
+    assert lines[5] == "    assert y == 3"
+    segments = render_window(path, 6)
+    pointer = segments.index(("❱ ", "red"))
+    assert segments[pointer + 1][0] == "6 "
+    assert segments[pointer + 3][0] == "assert"
+
+
+def test_function_spans_are_persisted(pytester: pytest.Pytester):
+    sample = pytester.makepyfile(
+        test_sample="""
+        def check(value):
+            assert value == 3
+
+        def test_value():
+            check(2)
+        """
+    )
+    spans_file = pytester.path / ".pytest_cache" / "v" / "modern" / "function_spans"
+
+    def stored_entry() -> list:
+        stat = sample.stat()
+        return [
+            stat.st_mtime_ns,
+            stat.st_size,
+            [[1, 2, "check"], [4, 5, "test_value"]],
+        ]
+
+    pytester.runpytest("--color=no")
+    assert json.loads(spans_file.read_text()) == {"test_sample.py": stored_entry()}
+
+    # an edited file is parsed again and its entry replaced
+    mtime = sample.stat().st_mtime_ns + 1_000_000_000
+    os.utime(sample, ns=(mtime, mtime))
+    pytester.runpytest("--color=no")
+    assert json.loads(spans_file.read_text()) == {"test_sample.py": stored_entry()}
+
+    # a malformed entry is a cache miss, not a crash
+    stat = sample.stat()
+    spans_file.write_text(
+        json.dumps(
+            {
+                "test_sample.py": [stat.st_mtime_ns, stat.st_size, [["a", "b", 3]]],
+                "gone.py": [0, 0, []],
+            }
+        )
+    )
+    result = pytester.runpytest("--color=no")
+    assert result.ret == pytest.ExitCode.TESTS_FAILED
+    result.stdout.fnmatch_lines(["*test_sample.py:2 in check*"])
+    # only the files shown in the session are kept
+    assert json.loads(spans_file.read_text()) == {"test_sample.py": stored_entry()}
+
+
+def test_funcname_is_innermost_function(tmp_path: Path):
+    path = tmp_path / "sample.py"
+    path.write_text(
+        "def outer():\n"
+        "    x = 1\n"
+        "\n"
+        "    def inner():\n"
+        "        return x\n"
+        "\n"
+        "    return inner()\n"
+        "\n"
+        "\n"
+        "async def run():\n"
+        "    await outer()\n"
+    )
+    error_repr = ModernErrorRepr("nodeid", None)
+    filename = str(path)
+
+    assert error_repr.get_funcname(1, filename) == "outer"
+    assert error_repr.get_funcname(2, filename) == "outer"
+    assert error_repr.get_funcname(4, filename) == "inner"
+    assert error_repr.get_funcname(5, filename) == "inner"
+    assert error_repr.get_funcname(7, filename) == "outer"
+    assert error_repr.get_funcname(8, filename) == "<module>"
+    assert error_repr.get_funcname(10, filename) == "run"
+    assert error_repr.get_funcname(11, filename) == "run"